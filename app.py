@@ -2,20 +2,26 @@
 Main Application - FastAPI Server
 Provides REST API for document upload and chat functionality
 """
+import asyncio
 import os
 import shutil
+import tempfile
 from typing import List, Optional
 from pathlib import Path
 
+import orjson
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
+from langchain.schema import Document
 
-from document_processor import DocumentProcessor
-from vector_store import get_vector_store
+from document_processor import DocumentProcessor, public_metadata
+from vector_store import get_vector_store, preload_embeddings
 from rag_chain import get_chatbot
 from llm_loader import get_llm_loader
+from semantic_cache import get_semantic_cache
 
 # Load environment variables
 load_dotenv()
@@ -24,7 +30,8 @@ load_dotenv()
 app = FastAPI(
     title="RAG Chatbot API",
     description="Document-based Q&A system using RAG and LangChain",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -40,6 +47,9 @@ app.add_middleware(
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Copy uploads to disk in 1 MiB chunks instead of the 64 KiB default
+UPLOAD_CHUNK_SIZE = 1 << 20
+
 # Initialize components
 document_processor = DocumentProcessor()
 
@@ -68,6 +78,9 @@ async def startup_event():
     print("Starting RAG Chatbot API")
     print("=" * 50)
     
+    # Load the embedding model in the background while the LLM loader starts
+    preload_embeddings()
+    
     try:
         # Initialize LLM loader
         llm_loader = get_llm_loader()
@@ -78,10 +91,19 @@ async def startup_event():
         doc_count = vector_store.get_collection_count()
         print(f"Vector store loaded: {doc_count} documents")
         
+        # Load embedding weights now so the first request doesn't pay for it
+        vector_store.warmup()
+        print("Embedding model warmed up")
+        
         # Initialize chatbot
         chatbot = get_chatbot()
         print("Chatbot initialized")
         
+        # Warming the LLM is a billed request, so it is opt-in
+        if os.getenv("WARMUP_LLM", "false").lower() == "true":
+            chatbot.warmup()
+            print("LLM warmed up")
+        
         print("=" * 50)
         print("✓ Server ready!")
         print("=" * 50)
@@ -99,6 +121,7 @@ async def root():
         "endpoints": {
             "upload": "/upload",
             "chat": "/chat",
+            "chat_stream": "/chat/stream",
             "history": "/history",
             "clear": "/clear",
             "status": "/status"
@@ -130,6 +153,44 @@ async def get_status():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _process_upload(file: UploadFile) -> List[Document]:
+    """
+    Save an uploaded file to disk and split it into chunks
+    
+    Runs in a worker thread so blocking I/O and parsing stay off the event loop
+    
+    Args:
+        file: Uploaded file
+        
+    Returns:
+        List of split Document objects
+    """
+    file_path = os.path.join(UPLOAD_DIR, file.filename)
+    
+    # Write and parse under a unique temporary name, then rename into place,
+    # so uploads sharing a filename never read or write the same file
+    with tempfile.NamedTemporaryFile(
+        dir=UPLOAD_DIR,
+        suffix=os.path.splitext(file.filename)[1],
+        delete=False
+    ) as buffer:
+        try:
+            shutil.copyfileobj(file.file, buffer, UPLOAD_CHUNK_SIZE)
+        except BaseException:
+            buffer.close()
+            os.remove(buffer.name)
+            raise
+    
+    try:
+        split_docs = document_processor.process_document(buffer.name, source_path=file_path)
+    except BaseException:
+        os.remove(buffer.name)
+        raise
+    
+    os.replace(buffer.name, file_path)
+    return split_docs
+
+
 @app.post("/upload")
 async def upload_documents(files: List[UploadFile] = File(...)):
     """
@@ -140,39 +201,58 @@ async def upload_documents(files: List[UploadFile] = File(...)):
     try:
         processed_files = []
         failed_files = []
+        all_splits = []
         
+        # A repeated filename would be saved over the first copy while it is
+        # still being processed, so only the first file with a name is kept
+        unique_files = []
+        seen_names = set()
         for file in files:
-            try:
-                # Save uploaded file
-                file_path = os.path.join(UPLOAD_DIR, file.filename)
-                
-                with open(file_path, "wb") as buffer:
-                    shutil.copyfileobj(file.file, buffer)
-                
-                # Process document
-                split_docs = document_processor.process_document(file_path)
-                
-                # Add to vector store
-                vector_store = get_vector_store()
-                vector_store.add_documents(split_docs)
-                
-                processed_files.append({
+            if file.filename in seen_names:
+                failed_files.append({
                     "filename": file.filename,
-                    "chunks": len(split_docs),
-                    "status": "success"
+                    "error": "Duplicate filename in upload",
+                    "status": "failed"
                 })
-                
-            except Exception as e:
+                continue
+            seen_names.add(file.filename)
+            unique_files.append(file)
+        
+        # Save and process all files concurrently
+        results = await asyncio.gather(
+            *(asyncio.to_thread(_process_upload, file) for file in unique_files),
+            return_exceptions=True
+        )
+        
+        for file, result in zip(unique_files, results):
+            if isinstance(result, Exception):
                 failed_files.append({
                     "filename": file.filename,
-                    "error": str(e),
+                    "error": str(result),
                     "status": "failed"
                 })
+                continue
+            
+            all_splits.extend(result)
+            processed_files.append({
+                "filename": file.filename,
+                "chunks": len(result),
+                "status": "success"
+            })
+        
+        # Add all chunks to the vector store in a single batch
+        if all_splits:
+            vector_store = get_vector_store()
+            await asyncio.to_thread(vector_store.add_documents, all_splits)
+            vector_store.flush()
         
         # Reinitialize chatbot chain with new documents
         chatbot = get_chatbot()
         chatbot.reinitialize_chain()
         
+        # Cached answers may be stale now that the corpus changed
+        get_semantic_cache().clear()
+        
         return {
             "message": f"Processed {len(processed_files)} file(s)",
             "processed": processed_files,
@@ -192,27 +272,91 @@ async def chat(request: ChatRequest):
     """
     try:
         chatbot = get_chatbot()
+        semantic_cache = get_semantic_cache()
+        
+        # Follow-ups are answered as standalone questions rewritten from the
+        # conversation, so that is what the cache is keyed on
+        standalone_question = chatbot.condense_question(request.question)
+        query_embedding = semantic_cache.embed_query(standalone_question)
+        cached_response = semantic_cache.lookup(query_embedding)
+        if cached_response is not None:
+            # Keep the turn in memory so follow-ups have its context
+            chatbot.save_turn(request.question, cached_response.answer)
+            return cached_response
         
         # Get response
         response = chatbot.chat(request.question)
         
-        # Format source documents
-        sources = []
-        for doc in response.get("source_documents", []):
-            sources.append({
-                "content": doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content,
-                "metadata": doc.metadata
-            })
-        
-        return ChatResponse(
+        chat_response = ChatResponse(
             answer=response["answer"],
-            sources=sources
+            sources=response.get("sources", [])
         )
         
+        # Only cache grounded answers, not errors or "no documents" replies
+        if chat_response.sources:
+            semantic_cache.add(query_embedding, chat_response)
+        
+        return chat_response
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _sse_event(data: dict, event: Optional[str] = None) -> str:
+    """Format a server-sent event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {orjson.dumps(data).decode()}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Chat with the RAG system, streaming the answer as server-sent events
+    
+    Each answer token is sent as a `data: {"token": ...}` event, followed by
+    a final `end` event carrying the full answer and its sources
+    """
+    async def event_stream():
+        try:
+            chatbot = get_chatbot()
+            semantic_cache = get_semantic_cache()
+            
+            # Cache is keyed on the standalone form of the question
+            standalone_question = await asyncio.to_thread(
+                chatbot.condense_question, request.question
+            )
+            query_embedding = await asyncio.to_thread(
+                semantic_cache.embed_query, standalone_question
+            )
+            cached_response = semantic_cache.lookup(query_embedding)
+            if cached_response is not None:
+                await asyncio.to_thread(
+                    chatbot.save_turn, request.question, cached_response.answer
+                )
+                yield _sse_event({"token": cached_response.answer})
+                yield _sse_event(cached_response.model_dump(), event="end")
+                return
+            
+            async for chunk in chatbot.astream_chat(request.question):
+                if "token" in chunk:
+                    yield _sse_event({"token": chunk["token"]})
+                    continue
+                
+                chat_response = ChatResponse(
+                    answer=chunk["answer"],
+                    sources=chunk["sources"]
+                )
+                if chat_response.sources:
+                    semantic_cache.add(query_embedding, chat_response)
+                
+                yield _sse_event(chat_response.model_dump(), event="end")
+        
+        except Exception as e:
+            yield _sse_event({"error": str(e)}, event="error")
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @app.get("/history")
 async def get_history():
     """Get chat history"""
@@ -251,6 +395,7 @@ async def delete_all_documents():
     try:
         vector_store = get_vector_store()
         vector_store.delete_collection()
+        get_semantic_cache().clear()
         
         # Clear uploaded files
         if os.path.exists(UPLOAD_DIR):
@@ -281,7 +426,7 @@ async def search_documents(query: str, k: int = 4):
         for doc, score in results:
             formatted_results.append({
                 "content": doc.page_content,
-                "metadata": doc.metadata,
+                "metadata": public_metadata(doc.metadata),
                 "relevance_score": float(score)
             })
         
@@ -299,9 +444,23 @@ if __name__ == "__main__":
     import uvicorn
     
     # Run the server
-    uvicorn.run(
-        "app:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
-    )
+    if os.getenv("DEV", "false").lower() == "true":
+        # Development: single worker with auto-reload
+        uvicorn.run(
+            "app:app",
+            host="0.0.0.0",
+            port=8000,
+            reload=True
+        )
+    else:
+        # Production: no file watching; uvloop/httptools are used when installed.
+        # Each worker holds its own models, chat memory and caches.
+        uvicorn.run(
+            "app:app",
+            host="0.0.0.0",
+            port=8000,
+            workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+            loop="auto",
+            http="auto",
+            reload=False
+        )
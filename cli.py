@@ -11,6 +11,9 @@ from vector_store import get_vector_store
 from rag_chain import get_chatbot
 from llm_loader import get_llm_loader
 
+# Shared document processor
+document_processor = DocumentProcessor()
+
 
 def print_banner():
     """Print welcome banner"""
@@ -45,18 +48,17 @@ def upload_documents():
         return
     
     try:
-        processor = DocumentProcessor()
-        
         if os.path.isfile(path):
             # Process single file
-            split_docs = processor.process_document(path)
+            split_docs = document_processor.process_document(path)
         else:
             # Process directory
-            split_docs = processor.process_directory(path)
+            split_docs = document_processor.process_directory(path)
         
-        # Add to vector store
+        # Add all chunks to the vector store in a single batch
         vector_store = get_vector_store()
         vector_store.add_documents(split_docs)
+        vector_store.flush()
         
         # Reinitialize chatbot
         chatbot = get_chatbot()
@@ -89,10 +91,10 @@ def chat_mode():
             
             print(f"\nAssistant: {response['answer']}")
             
-            if response.get('source_documents'):
-                print(f"\n📚 Sources ({len(response['source_documents'])} documents):")
-                for i, doc in enumerate(response['source_documents'][:2], 1):
-                    source = doc.metadata.get('source', 'Unknown')
+            if response.get('sources'):
+                print(f"\n📚 Sources ({len(response['sources'])} documents):")
+                for i, doc in enumerate(response['sources'][:2], 1):
+                    source = doc['metadata'].get('source', 'Unknown')
                     print(f"  {i}. {source}")
         
         except Exception as e:
@@ -178,8 +180,7 @@ def show_status():
         print(f"🔧 Available LLMs: {', '.join(llm_loader.list_available_llms())}")
         
         # Supported formats
-        processor = DocumentProcessor()
-        print(f"📄 Supported Formats: {', '.join(processor.get_supported_extensions())}")
+        print(f"📄 Supported Formats: {', '.join(document_processor.get_supported_extensions())}")
         
     except Exception as e:
         print(f"❌ Error: {str(e)}")
@@ -3,9 +3,13 @@ Document Processor
 Handles loading and processing of various document types
 Supports: PDF, DOCX, HTML, CSV, XLSX, TXT
 """
+import functools
+import hashlib
 import os
-from typing import List, Optional
-from pathlib import Path
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import (
@@ -21,6 +25,140 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Number of characters of a chunk shown in source previews
+PREVIEW_LENGTH = 200
+
+# Bytes read at a time when hashing a file for the parse cache
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def make_preview(text: str) -> str:
+    """
+    Truncate chunk text for display in source listings
+    
+    Args:
+        text: Chunk text
+        
+    Returns:
+        First PREVIEW_LENGTH characters, with "..." appended if truncated
+    """
+    if len(text) > PREVIEW_LENGTH:
+        return text[:PREVIEW_LENGTH] + "..."
+    return text
+
+
+def public_metadata(metadata: dict) -> dict:
+    """
+    Drop fields stored only for internal use from chunk metadata
+    
+    Args:
+        metadata: Chunk metadata
+        
+    Returns:
+        Copy of the metadata without the stored preview
+    """
+    return {key: value for key, value in metadata.items() if key != "preview"}
+
+
+@functools.lru_cache(maxsize=8)
+def _build_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    """
+    Build a text splitter, shared by all processors with the same settings
+    
+    Args:
+        chunk_size: Size of text chunks
+        chunk_overlap: Overlap between chunks
+        
+    Returns:
+        RecursiveCharacterTextSplitter instance
+    """
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=["\n\n", "\n", " ", ""]
+    )
+
+
+def _file_digest(file_path: str) -> str:
+    """
+    Hash a file's contents, so identical uploads share a cache entry whatever
+    their path or modification time
+    
+    Args:
+        file_path: Path to the file
+        
+    Returns:
+        Hex SHA-256 digest of the file
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _ParseCache:
+    """LRU cache of parsed files, bounded by the total size of their text"""
+    
+    def __init__(self, max_bytes: int):
+        """
+        Initialize the Parse Cache
+        
+        Args:
+            max_bytes: Upper bound on the summed text length of cached parses
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, Tuple[Tuple[Document, ...], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+    
+    def get(self, key: tuple) -> Optional[Tuple[Document, ...]]:
+        """Return the cached parse for a key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+    
+    def put(self, key: tuple, documents: Tuple[Document, ...]):
+        """Cache a parse, evicting the least recently used ones over the byte bound"""
+        size = sum(len(doc.page_content) for doc in documents)
+        if size > self.max_bytes:
+            return
+        
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (documents, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+
+_parse_cache = _ParseCache(int(os.getenv("DOCUMENT_CACHE_MAX_BYTES", str(64 << 20))))
+
+
+def _load_cached(loader_class, file_path: str) -> Tuple[Document, ...]:
+    """
+    Load a file, reusing an earlier parse of identical contents
+    
+    Args:
+        loader_class: Document loader class for the file type
+        file_path: Path to the document file
+        
+    Returns:
+        Tuple of loaded Document objects
+    """
+    key = (loader_class, _file_digest(file_path))
+    documents = _parse_cache.get(key)
+    if documents is None:
+        documents = tuple(loader_class(file_path).load())
+        _parse_cache.put(key, documents)
+    return documents
+
 
 class DocumentProcessor:
     """Process and split documents for RAG"""
@@ -40,12 +178,7 @@ class DocumentProcessor:
         self.chunk_size = chunk_size or int(os.getenv("CHUNK_SIZE", "1000"))
         self.chunk_overlap = chunk_overlap or int(os.getenv("CHUNK_OVERLAP", "200"))
         
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""]
-        )
+        self.text_splitter = _build_splitter(self.chunk_size, self.chunk_overlap)
         
         # Supported file extensions and their loaders
         self.loader_mapping = {
@@ -59,6 +192,8 @@ class DocumentProcessor:
             ".xls": UnstructuredExcelLoader,
             ".txt": TextLoader,
         }
+        self._supported_ext = frozenset(self.loader_mapping.keys())
+        self._ext_tuple = tuple(self.loader_mapping.keys())
     
     def get_loader_for_file(self, file_path: str):
         """
@@ -70,23 +205,37 @@ class DocumentProcessor:
         Returns:
             Appropriate document loader instance
         """
-        file_extension = Path(file_path).suffix.lower()
+        return self._get_loader_class(file_path)(file_path)
+    
+    def _get_loader_class(self, file_path: str):
+        """
+        Get the document loader class for a file
         
-        if file_extension not in self.loader_mapping:
+        Args:
+            file_path: Path to the document file
+            
+        Returns:
+            Document loader class
+        """
+        file_extension = os.path.splitext(file_path)[1].lower()
+        loader_class = self.loader_mapping.get(file_extension)
+        
+        if loader_class is None:
             raise ValueError(
                 f"Unsupported file type: {file_extension}. "
-                f"Supported types: {', '.join(self.loader_mapping.keys())}"
+                f"Supported types: {', '.join(self._ext_tuple)}"
             )
         
-        loader_class = self.loader_mapping[file_extension]
-        return loader_class(file_path)
+        return loader_class
     
-    def load_document(self, file_path: str) -> List[Document]:
+    def load_document(self, file_path: str, source_path: Optional[str] = None) -> List[Document]:
         """
         Load a document from file
         
         Args:
             file_path: Path to the document file
+            source_path: Path recorded in the metadata, when the file is read
+                from a temporary location (default file_path)
             
         Returns:
             List of Document objects
@@ -95,13 +244,20 @@ class DocumentProcessor:
             raise FileNotFoundError(f"File not found: {file_path}")
         
         try:
-            loader = self.get_loader_for_file(file_path)
-            documents = loader.load()
+            loader_class = self._get_loader_class(file_path)
+            loaded = _load_cached(loader_class, file_path)
+            
+            # Copy so callers can't modify the cached parse
+            documents = [
+                Document(page_content=doc.page_content, metadata=dict(doc.metadata))
+                for doc in loaded
+            ]
             
             # Add source metadata
+            source_path = source_path or file_path
             for doc in documents:
-                doc.metadata["source"] = os.path.basename(file_path)
-                doc.metadata["file_path"] = file_path
+                doc.metadata["source"] = os.path.basename(source_path)
+                doc.metadata["file_path"] = source_path
             
             return documents
         
@@ -118,19 +274,27 @@ class DocumentProcessor:
         Returns:
             List of split Document objects
         """
-        return self.text_splitter.split_documents(documents)
+        split_docs = self.text_splitter.split_documents(documents)
+        
+        # Store the response preview once so it isn't re-sliced on every query
+        for doc in split_docs:
+            doc.metadata["preview"] = make_preview(doc.page_content)
+        
+        return split_docs
     
-    def process_document(self, file_path: str) -> List[Document]:
+    def process_document(self, file_path: str, source_path: Optional[str] = None) -> List[Document]:
         """
         Load and split a document in one step
         
         Args:
             file_path: Path to the document file
+            source_path: Path recorded in the metadata, when the file is read
+                from a temporary location (default file_path)
             
         Returns:
             List of split Document objects ready for embedding
         """
-        documents = self.load_document(file_path)
+        documents = self.load_document(file_path, source_path)
         split_docs = self.split_documents(documents)
         
         print(f"Processed {file_path}:")
@@ -151,13 +315,23 @@ class DocumentProcessor:
         """
         all_splits = []
         
-        for file_path in file_paths:
-            try:
-                splits = self.process_document(file_path)
-                all_splits.extend(splits)
-            except Exception as e:
-                print(f"Error processing {file_path}: {str(e)}")
-                continue
+        if not file_paths:
+            print("No documents to process")
+            return all_splits
+        
+        # Load and split files concurrently; results are collected in input order
+        with ThreadPoolExecutor(max_workers=min(8, len(file_paths))) as executor:
+            futures = {
+                executor.submit(self.process_document, file_path): file_path
+                for file_path in file_paths
+            }
+            
+            for future, file_path in futures.items():
+                try:
+                    all_splits.extend(future.result())
+                except Exception as e:
+                    print(f"Error processing {file_path}: {str(e)}")
+                    continue
         
         print(f"\nTotal processed: {len(all_splits)} chunks from {len(file_paths)} files")
         return all_splits
@@ -181,27 +355,26 @@ class DocumentProcessor:
             raise NotADirectoryError(f"Not a directory: {directory_path}")
         
         file_paths = []
+        pending_dirs = [directory_path]
         
-        if recursive:
-            for root, _, files in os.walk(directory_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    if Path(file_path).suffix.lower() in self.loader_mapping:
-                        file_paths.append(file_path)
-        else:
-            for file in os.listdir(directory_path):
-                file_path = os.path.join(directory_path, file)
-                if os.path.isfile(file_path) and Path(file_path).suffix.lower() in self.loader_mapping:
-                    file_paths.append(file_path)
+        # scandir entries carry file type info from the directory read,
+        # so most entries need no extra stat() call
+        while pending_dirs:
+            with os.scandir(pending_dirs.pop()) as entries:
+                for entry in entries:
+                    if recursive and entry.is_dir(follow_symlinks=False):
+                        pending_dirs.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in self._supported_ext and entry.is_file():
+                        file_paths.append(entry.path)
         
         print(f"Found {len(file_paths)} supported documents in {directory_path}")
         return self.process_multiple_documents(file_paths)
     
-    def get_supported_extensions(self) -> List[str]:
+    def get_supported_extensions(self) -> Tuple[str, ...]:
         """
-        Get list of supported file extensions
+        Get supported file extensions
         
         Returns:
-            List of supported file extensions
+            Tuple of supported file extensions
         """
-        return list(self.loader_mapping.keys())
+        return self._ext_tuple
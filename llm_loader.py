@@ -5,12 +5,22 @@ Loads and initializes LLMs from config/llm.json
 import json
 import os
 import importlib
-from typing import Dict, Any, Optional
+import re
+import threading
+from typing import Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # Optional faster JSON parser
+    orjson = None
+
 # Load environment variables
 load_dotenv(override=True)
 
+# Matches config values of the form ENV:VARIABLE_NAME
+ENV_REFERENCE_RE = re.compile(r"^ENV:(\w+)$")
+
 
 class LLMConfigLoader:
     """Loads and manages LLM configurations from llm.json"""
@@ -25,52 +35,73 @@ class LLMConfigLoader:
         self.config_path = config_path
         self.config = self._load_config()
         self.llm_instances = {}
+        self._resolved_configs: Dict[str, Dict[str, Any]] = {}
+        self._class_cache: Dict[Tuple[str, str], type] = {}
         
         # Load LLMs marked for initialization
         self._load_initial_llms()
     
     def _load_config(self) -> Dict[str, Any]:
         """Load the JSON configuration file"""
+        if orjson is not None:
+            with open(self.config_path, 'rb') as f:
+                return orjson.loads(f.read())
+        
         with open(self.config_path, 'r') as f:
             return json.load(f)
     
-    def _resolve_env_value(self, value: str) -> str:
+    def _resolve_config_values(self, config: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Resolve environment variable references in config values
+        Resolve all ENV: references in a config dictionary in a single pass
         
         Args:
-            value: Configuration value (may contain ENV:VARIABLE_NAME)
+            config: Configuration dictionary
             
         Returns:
-            Resolved value from environment or original value
+            Resolved configuration dictionary
+            
+        Raises:
+            ValueError: If any referenced environment variables are not set
         """
-        if isinstance(value, str) and value.startswith("ENV:"):
-            env_var = value.split("ENV:")[1]
-            env_value = os.getenv(env_var)
-            if env_value is None:
-                raise ValueError(f"Environment variable {env_var} not found")
-            return env_value
-        return value
+        resolved = {}
+        missing = []
+        stack = [(config, resolved)]
+        
+        while stack:
+            source, target = stack.pop()
+            for key, value in source.items():
+                if isinstance(value, dict):
+                    target[key] = {}
+                    stack.append((value, target[key]))
+                elif isinstance(value, str) and (match := ENV_REFERENCE_RE.match(value)):
+                    env_value = os.getenv(match.group(1))
+                    if env_value is None:
+                        missing.append(match.group(1))
+                    target[key] = env_value
+                else:
+                    target[key] = value
+        
+        if missing:
+            raise ValueError(f"Environment variable(s) not found: {', '.join(missing)}")
+        
+        return resolved
     
-    def _resolve_config_values(self, config: Dict[str, Any]) -> Dict[str, Any]:
+    def _get_resolved_config(self, llm_name: str) -> Dict[str, Any]:
         """
-        Recursively resolve all ENV: references in config dictionary
+        Get the resolved constructor config for an LLM, resolving it only once
         
         Args:
-            config: Configuration dictionary
+            llm_name: Name of the LLM
             
         Returns:
             Resolved configuration dictionary
         """
-        resolved = {}
-        for key, value in config.items():
-            if isinstance(value, dict):
-                resolved[key] = self._resolve_config_values(value)
-            elif isinstance(value, str):
-                resolved[key] = self._resolve_env_value(value)
-            else:
-                resolved[key] = value
-        return resolved
+        if llm_name not in self._resolved_configs:
+            llm_config = self.get_llm_config(llm_name)
+            self._resolved_configs[llm_name] = self._resolve_config_values(
+                llm_config.get("config", {})
+            )
+        return self._resolved_configs[llm_name]
     
     def _load_initial_llms(self):
         """Load LLMs that have load_on_init set to True"""
@@ -110,15 +141,19 @@ class LLMConfigLoader:
         if not module_name or not class_name:
             raise ValueError(f"Missing import_module or import_class for {llm_name}")
         
-        # Import the module and class
-        try:
-            module = importlib.import_module(module_name)
-            llm_class = getattr(module, class_name)
-        except (ImportError, AttributeError) as e:
-            raise ImportError(f"Could not import {class_name} from {module_name}: {str(e)}")
+        # Resolve configuration values (ENV references) before paying for the import
+        resolved_config = self._get_resolved_config(llm_name)
         
-        # Resolve configuration values (ENV references)
-        resolved_config = self._resolve_config_values(llm_config.get("config", {}))
+        # Import the module and class, reusing earlier lookups
+        class_key = (module_name, class_name)
+        llm_class = self._class_cache.get(class_key)
+        if llm_class is None:
+            try:
+                module = importlib.import_module(module_name)
+                llm_class = getattr(module, class_name)
+            except (ImportError, AttributeError) as e:
+                raise ImportError(f"Could not import {class_name} from {module_name}: {str(e)}")
+            self._class_cache[class_key] = llm_class
         
         # Instantiate the LLM
         llm_instance = llm_class(**resolved_config)
@@ -169,6 +204,7 @@ class LLMConfigLoader:
 
 # Global instance for easy access
 _llm_loader: Optional[LLMConfigLoader] = None
+_llm_loader_lock = threading.Lock()
 
 
 def get_llm_loader() -> LLMConfigLoader:
@@ -180,7 +216,9 @@ def get_llm_loader() -> LLMConfigLoader:
     """
     global _llm_loader
     if _llm_loader is None:
-        _llm_loader = LLMConfigLoader()
+        with _llm_loader_lock:
+            if _llm_loader is None:
+                _llm_loader = LLMConfigLoader()
     return _llm_loader
 
 
@@ -2,15 +2,76 @@
 RAG Chain with Memory
 Implements Retrieval Augmented Generation with conversation memory
 """
-from typing import List, Dict, Any, Optional
+import queue
+import threading
+from typing import AsyncIterator, Iterator, List, Dict, Any, Optional, Tuple
 from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
+from langchain.memory import ConversationSummaryBufferMemory
 from langchain_core.prompts import PromptTemplate
 from langchain.chains import LLMChain
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.pydantic_v1 import Field
 
+from document_processor import make_preview, public_metadata
 from llm_loader import get_manager_llm
 from vector_store import get_vector_store
 
+# Tag on the question-rephrasing LLM so its tokens are not streamed as answer text
+CONDENSE_QUESTION_TAG = "condense_question"
+
+# Speaker labels used when rendering chat history into prompts
+ROLE_PREFIXES = {"human": "Human: ", "ai": "Assistant: ", "system": "Summary: "}
+
+
+def _format_sources(source_documents: List) -> List[Dict[str, Any]]:
+    """
+    Reduce retrieved documents to what callers display
+    
+    Args:
+        source_documents: Retrieved Document objects
+        
+    Returns:
+        List of source dictionaries with a content preview and metadata
+    """
+    return [
+        {
+            "content": doc.metadata.get("preview") or make_preview(doc.page_content),
+            "metadata": public_metadata(doc.metadata)
+        }
+        for doc in source_documents
+    ]
+
+
+class _CondenseQuestionChain(LLMChain):
+    """Question-rephrasing chain that reuses standalone questions generated ahead of a run"""
+    
+    precomputed: Dict[Tuple[str, str], str] = Field(default_factory=dict)
+    """Standalone questions keyed by (question, rendered chat history)"""
+    
+    def _call(self, inputs: Dict[str, Any], run_manager=None) -> Dict[str, str]:
+        key = (inputs["question"], inputs["chat_history"])
+        if key in self.precomputed:
+            return {self.output_key: self.precomputed.pop(key)}
+        return super()._call(inputs, run_manager=run_manager)
+    
+    async def _acall(self, inputs: Dict[str, Any], run_manager=None) -> Dict[str, str]:
+        key = (inputs["question"], inputs["chat_history"])
+        if key in self.precomputed:
+            return {self.output_key: self.precomputed.pop(key)}
+        return await super()._acall(inputs, run_manager=run_manager)
+
+
+class _TokenQueueHandler(BaseCallbackHandler):
+    """Callback handler that forwards answer tokens to a queue"""
+    
+    def __init__(self, token_queue: queue.Queue):
+        self.token_queue = token_queue
+    
+    def on_llm_new_token(self, token: str, *, tags: Optional[List[str]] = None, **kwargs: Any):
+        # Skip tokens from rephrasing the question; only the answer is streamed
+        if token and CONDENSE_QUESTION_TAG not in (tags or []):
+            self.token_queue.put(token)
+
 
 class RAGChatbot:
     """RAG-based chatbot with conversation memory"""
@@ -19,7 +80,8 @@ class RAGChatbot:
         self,
         memory_key: str = "chat_history",
         return_source_documents: bool = True,
-        max_tokens_limit: int = 3000,
+        max_tokens_limit: int = 1000,
+        history_window: int = 6,
         verbose: bool = False
     ):
         """
@@ -28,11 +90,13 @@ class RAGChatbot:
         Args:
             memory_key: Key for storing chat history in memory
             return_source_documents: Whether to return source documents
-            max_tokens_limit: Maximum tokens for memory buffer
+            max_tokens_limit: Token budget for verbatim history; older turns are summarized
+            history_window: Most recent messages rendered into prompts, after the summary
             verbose: Whether to print verbose output
         """
         self.memory_key = memory_key
         self.return_source_documents = return_source_documents
+        self.history_window = history_window
         self.verbose = verbose
         
         # Initialize LLM
@@ -44,14 +108,16 @@ class RAGChatbot:
         self.vector_store_manager = get_vector_store()
         
         # Initialize conversation memory
-        self.memory = ConversationBufferMemory(
+        self.memory = ConversationSummaryBufferMemory(
+            llm=self.llm,
             memory_key=memory_key,
             return_messages=True,
             output_key='answer',
             max_token_limit=max_tokens_limit
         )
         
-        # Create the conversational chain
+        # Create the conversational chain; the prompt never changes, so build it once
+        self._prompt = self._get_custom_prompt()
         self.chain = None
         self._initialize_chain()
     
@@ -90,18 +156,35 @@ Helpful Answer:"""
                 search_kwargs={"k": 4}
             )
             
+            # Only the retriever depends on the vector store, so reuse the chain
+            if self.chain is not None:
+                self.chain.retriever = retriever
+                print("✓ RAG Chain retriever updated")
+                return
+            
             # Create the conversational retrieval chain
             self.chain = ConversationalRetrievalChain.from_llm(
                 llm=self.llm,
+                condense_question_llm=self.llm.with_config(
+                    tags=[CONDENSE_QUESTION_TAG]
+                ),
                 retriever=retriever,
                 memory=self.memory,
+                get_chat_history=self._format_chat_history,
                 return_source_documents=self.return_source_documents,
                 verbose=self.verbose,
                 combine_docs_chain_kwargs={
-                    "prompt": self._get_custom_prompt()
+                    "prompt": self._prompt
                 }
             )
             
+            # Same prompt and LLM, but reuses questions from condense_question
+            self.chain.question_generator = _CondenseQuestionChain(
+                llm=self.chain.question_generator.llm,
+                prompt=self.chain.question_generator.prompt,
+                verbose=self.verbose
+            )
+            
             print("✓ RAG Chain initialized successfully")
             
         except Exception as e:
@@ -109,6 +192,48 @@ Helpful Answer:"""
             print("Please add documents to the vector store first.")
             self.chain = None
     
+    def _format_chat_history(self, messages: List) -> str:
+        """
+        Render chat history for the prompts
+        
+        Keeps the running summary of pruned turns and only the last
+        ``history_window`` messages, so prompt size stays bounded even while
+        the memory buffer is under its token limit
+        
+        Args:
+            messages: Messages from memory, led by the summary if there is one
+            
+        Returns:
+            Chat history as text
+        """
+        summary = [msg for msg in messages[:1] if msg.type == "system"]
+        recent = messages[len(summary):]
+        recent = recent[-self.history_window:] if self.history_window > 0 else []
+        
+        return "".join(
+            f"\n{ROLE_PREFIXES.get(msg.type, f'{msg.type}: ')}{msg.content}"
+            for msg in summary + recent
+        )
+    
+    def warmup(self):
+        """
+        Send a 1-token request to the LLM to open the provider connection
+        and load any local weights before the first real question
+        """
+        self.llm.bind(max_tokens=1).invoke("warmup")
+    
+    def _chain_is_current(self) -> bool:
+        """
+        Check whether the chain exists and there is a store to retrieve from
+        
+        The retriever searches through the vector store manager, so it sees
+        new documents and a replaced store without being rebuilt
+        
+        Returns:
+            True if the chain can be used as is
+        """
+        return self.chain is not None and self.vector_store_manager.vectorstore is not None
+    
     def reinitialize_chain(self):
         """Reinitialize the chain (useful after adding new documents)"""
         self._initialize_chain()
@@ -121,15 +246,16 @@ Helpful Answer:"""
             question: User's question
             
         Returns:
-            Dictionary containing answer and source documents
+            Dictionary containing the answer and its sources, each a content
+            preview with the chunk's metadata
         """
-        if self.chain is None:
+        if not self._chain_is_current():
             self._initialize_chain()
             
             if self.chain is None:
                 return {
                     "answer": "I don't have any documents to answer questions from. Please upload documents first.",
-                    "source_documents": []
+                    "sources": []
                 }
         
         try:
@@ -138,16 +264,16 @@ Helpful Answer:"""
             
             return {
                 "answer": response.get("answer", ""),
-                "source_documents": response.get("source_documents", [])
+                "sources": _format_sources(response.get("source_documents", []))
             }
             
         except Exception as e:
             return {
                 "answer": f"An error occurred: {str(e)}",
-                "source_documents": []
+                "sources": []
             }
     
-    def chat_stream(self, question: str):
+    def chat_stream(self, question: str) -> Iterator[str]:
         """
         Stream the response from the chatbot
         
@@ -157,21 +283,133 @@ Helpful Answer:"""
         Yields:
             Chunks of the response
         """
-        if self.chain is None:
+        for chunk in self.stream_chat(question):
+            if "token" in chunk:
+                yield chunk["token"]
+    
+    def stream_chat(self, question: str) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the answer to a question token by token
+        
+        The chain runs in a worker thread and a callback handler forwards each
+        answer token as the LLM produces it. An LLM configured without
+        streaming produces no tokens, so its answer is sent as one token
+        
+        Args:
+            question: User's question
+            
+        Yields:
+            {"token": str} for each answer token, followed by one final
+            {"answer": str, "sources": list} with the full response
+        """
+        if not self._chain_is_current():
+            self._initialize_chain()
+            
+            if self.chain is None:
+                answer = "I don't have any documents to answer questions from. Please upload documents first."
+                yield {"token": answer}
+                yield {"answer": answer, "sources": []}
+                return
+        
+        token_queue: queue.Queue = queue.Queue()
+        done = object()
+        result: Dict[str, Any] = {}
+        
+        def run_chain():
+            try:
+                result["response"] = self.chain.invoke(
+                    {"question": question},
+                    config={"callbacks": [_TokenQueueHandler(token_queue)]}
+                )
+            except Exception as e:
+                result["error"] = e
+            finally:
+                token_queue.put(done)
+        
+        threading.Thread(target=run_chain, daemon=True).start()
+        
+        streamed = False
+        while (token := token_queue.get()) is not done:
+            streamed = True
+            yield {"token": token}
+        
+        if "error" in result:
+            answer = f"An error occurred: {str(result['error'])}"
+            yield {"token": answer}
+            yield {"answer": answer, "sources": []}
+            return
+        
+        response = result["response"]
+        answer = response.get("answer", "")
+        if not streamed and answer:
+            yield {"token": answer}
+        yield {
+            "answer": answer,
+            "sources": _format_sources(response.get("source_documents", []))
+        }
+    
+    async def astream_chat(self, question: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the answer to a question token by token
+        
+        Args:
+            question: User's question
+            
+        Yields:
+            {"token": str} for each answer token, followed by one final
+            {"answer": str, "sources": list} with the full response
+        """
+        if not self._chain_is_current():
             self._initialize_chain()
             
             if self.chain is None:
-                yield "I don't have any documents to answer questions from. Please upload documents first."
+                answer = "I don't have any documents to answer questions from. Please upload documents first."
+                yield {"token": answer}
+                yield {"answer": answer, "sources": []}
                 return
         
         try:
-            # For streaming, we need to use a different approach
-            # This is a simplified version - full streaming requires more setup
-            response = self.chat(question)
-            yield response["answer"]
+            root_run_id = None
+            response = {}
+            streamed = False
+            
+            # Question rephrasing also calls the LLM; only the answer is streamed
+            async for event in self.chain.astream_events(
+                {"question": question},
+                version="v1",
+                exclude_tags=[CONDENSE_QUESTION_TAG]
+            ):
+                if root_run_id is None:
+                    root_run_id = event["run_id"]
+                
+                kind = event["event"]
+                if kind == "on_chat_model_stream":
+                    token = event["data"]["chunk"].content
+                elif kind == "on_llm_stream":
+                    chunk = event["data"]["chunk"]
+                    token = chunk if isinstance(chunk, str) else chunk.text
+                else:
+                    if kind == "on_chain_end" and event["run_id"] == root_run_id:
+                        response = event["data"].get("output") or {}
+                    continue
+                
+                if token:
+                    streamed = True
+                    yield {"token": token}
+            
+            # Non-streaming LLMs emit no stream events; send the answer whole
+            answer = response.get("answer", "")
+            if not streamed and answer:
+                yield {"token": answer}
+            yield {
+                "answer": answer,
+                "sources": _format_sources(response.get("source_documents", []))
+            }
             
         except Exception as e:
-            yield f"An error occurred: {str(e)}"
+            answer = f"An error occurred: {str(e)}"
+            yield {"token": answer}
+            yield {"answer": answer, "sources": []}
     
     def get_chat_history(self) -> List[Dict[str, str]]:
         """
@@ -184,6 +422,13 @@ Helpful Answer:"""
             messages = self.memory.chat_memory.messages
             history = []
             
+            # Turns pruned from the buffer survive only as a running summary
+            if self.memory.moving_summary_buffer:
+                history.append({
+                    "role": "system",
+                    "content": self.memory.moving_summary_buffer
+                })
+            
             for msg in messages:
                 if hasattr(msg, 'type'):
                     history.append({
@@ -195,6 +440,49 @@ Helpful Answer:"""
         except:
             return []
     
+    def condense_question(self, question: str) -> str:
+        """
+        Rewrite a question into the standalone form the chain will answer
+        
+        Follow-ups are rewritten using the chat history, as the chain does.
+        The result is kept for the next chain run, which reuses it instead
+        of asking the LLM again.
+        
+        Args:
+            question: User's question
+            
+        Returns:
+            Standalone question, or the question itself when there is no history
+        """
+        if not self._chain_is_current():
+            self._initialize_chain()
+        if self.chain is None:
+            return question
+        
+        chat_history = self._format_chat_history(
+            self.memory.load_memory_variables({})[self.memory_key]
+        )
+        if not chat_history:
+            return question
+        
+        question_generator = self.chain.question_generator
+        standalone_question = question_generator.run(
+            question=question,
+            chat_history=chat_history
+        )
+        question_generator.precomputed = {(question, chat_history): standalone_question}
+        return standalone_question
+    
+    def save_turn(self, question: str, answer: str):
+        """
+        Record a turn answered outside the chain (e.g. from a cache) in memory
+        
+        Args:
+            question: User's question
+            answer: Answer given
+        """
+        self.memory.save_context({"question": question}, {"answer": answer})
+    
     def clear_memory(self):
         """Clear the conversation memory"""
         self.memory.clear()
@@ -208,8 +496,11 @@ Helpful Answer:"""
             documents: List of Document objects
         """
         self.vector_store_manager.add_documents(documents)
-        self.reinitialize_chain()
-        print("✓ Documents added and chain reinitialized")
+        self.vector_store_manager.flush()
+        
+        if not self._chain_is_current():
+            self._initialize_chain()
+        print("✓ Documents added")
     
     def get_relevant_documents(self, query: str, k: int = 4):
         """
@@ -226,10 +517,27 @@ Helpful Answer:"""
             query=query,
             k=k
         )
+    
+    def get_relevant_documents_batch(self, queries: List[str], k: int = 4):
+        """
+        Get relevant documents for several queries in one batched lookup
+        
+        Args:
+            queries: Search queries
+            k: Number of documents to return per query
+            
+        Returns:
+            One list of relevant documents with scores per query
+        """
+        return self.vector_store_manager.batch_similarity_search_with_score(
+            queries=queries,
+            k=k
+        )
 
 
 # Global chatbot instance
 _chatbot: Optional[RAGChatbot] = None
+_chatbot_lock = threading.Lock()
 
 
 def get_chatbot() -> RAGChatbot:
@@ -241,5 +549,7 @@ def get_chatbot() -> RAGChatbot:
     """
     global _chatbot
     if _chatbot is None:
-        _chatbot = RAGChatbot()
+        with _chatbot_lock:
+            if _chatbot is None:
+                _chatbot = RAGChatbot()
     return _chatbot
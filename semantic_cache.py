@@ -0,0 +1,183 @@
+"""
+Semantic Cache
+Caches chat responses keyed by question embedding so near-duplicate
+questions can be answered without re-running retrieval and the LLM
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+try:
+    from numba import njit, prange
+except ImportError:  # Optional JIT for the similarity scan
+    njit = None
+
+load_dotenv()
+
+
+def _best_match_numpy(matrix: np.ndarray, query: np.ndarray):
+    """
+    Find the row most similar to a query
+
+    Args:
+        matrix: Normalized embeddings laid out [N, d]
+        query: Normalized query embedding
+
+    Returns:
+        Tuple (row index, cosine similarity)
+    """
+    scores = matrix @ query
+    slot = np.argmax(scores)
+    return slot, scores[slot]
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _best_match(matrix, query):
+        scores = np.empty(matrix.shape[0], dtype=np.float32)
+        for i in prange(matrix.shape[0]):
+            total = np.float32(0.0)
+            for j in range(matrix.shape[1]):
+                total += matrix[i, j] * query[j]
+            scores[i] = total
+        slot = np.argmax(scores)
+        return slot, scores[slot]
+else:
+    _best_match = _best_match_numpy
+
+
+class SemanticCache:
+    """Embedding-similarity cache with SIM-LRU eviction"""
+
+    def __init__(
+        self,
+        embedding_function: Callable[[str], List[float]],
+        threshold: float = None,
+        capacity: int = None
+    ):
+        """
+        Initialize the Semantic Cache
+
+        Args:
+            embedding_function: Function that embeds a single query string
+            threshold: Minimum cosine similarity for a hit (default from env or 0.95)
+            capacity: Maximum number of cached entries (default from env or 1024)
+        """
+        self.embedding_function = embedding_function
+        self.threshold = threshold or float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+        self.capacity = capacity or int(os.getenv("SEMANTIC_CACHE_SIZE", "1024"))
+
+        # Row i of the matrix holds the normalized embedding for slot i;
+        # allocated on first insert once the embedding dimension is known
+        self._embeddings: Optional[np.ndarray] = None
+        self._entries: List[Any] = []
+        self._size = 0
+
+        # Slot recency order, least recently used first
+        self._lru: "OrderedDict[int, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """
+        Embed and L2-normalize a query
+
+        Args:
+            query: Query text
+
+        Returns:
+            Normalized float32 embedding vector
+        """
+        embedding = np.asarray(self.embedding_function(query), dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        if norm > 0:
+            embedding /= norm
+        return embedding
+
+    def lookup(self, query_embedding: np.ndarray) -> Optional[Any]:
+        """
+        Find a cached response for a semantically similar query
+
+        Args:
+            query_embedding: Normalized query embedding from embed_query
+
+        Returns:
+            Cached response, or None on a miss
+        """
+        with self._lock:
+            if self._size == 0:
+                return None
+
+            slot, score = _best_match(self._embeddings[:self._size], query_embedding)
+            if score < self.threshold:
+                return None
+
+            slot = int(slot)
+            self._lru.move_to_end(slot)
+            return self._entries[slot]
+
+    def add(self, query_embedding: np.ndarray, response: Any):
+        """
+        Cache a response, evicting the least recently used entry at capacity
+
+        Args:
+            query_embedding: Normalized query embedding from embed_query
+            response: Response to return for similar queries
+        """
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = np.zeros(
+                    (self.capacity, query_embedding.shape[0]),
+                    dtype=np.float32
+                )
+
+            if self._size < self.capacity:
+                slot = self._size
+                self._size += 1
+                self._entries.append(response)
+            else:
+                slot, _ = self._lru.popitem(last=False)
+                self._entries[slot] = response
+
+            self._embeddings[slot] = query_embedding
+            self._lru[slot] = None
+
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self._entries = []
+            self._size = 0
+            self._lru.clear()
+
+    def __len__(self) -> int:
+        return self._size
+
+
+# Global instance for easy access
+_semantic_cache: Optional[SemanticCache] = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticCache:
+    """
+    Get the global semantic cache instance (singleton pattern)
+
+    Returns:
+        SemanticCache instance backed by the vector store's embedding model
+    """
+    from vector_store import get_vector_store
+
+    global _semantic_cache
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                vector_store = get_vector_store()
+                _semantic_cache = SemanticCache(
+                    embedding_function=vector_store.embeddings.embed_query
+                )
+                # Cached answers go stale when any process changes the documents
+                vector_store.add_invalidation_callback(_semantic_cache.clear)
+    return _semantic_cache
@@ -5,11 +5,16 @@ Interactive web interface for document upload and chat
 import streamlit as st
 import os
 import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
+from typing import List
+
+from langchain.schema import Document
 
 from document_processor import DocumentProcessor
-from vector_store import get_vector_store
+from vector_store import get_vector_store, preload_embeddings
 from rag_chain import get_chatbot
 from llm_loader import get_llm_loader
 
@@ -59,21 +64,115 @@ st.markdown("""
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Bytes copied per read when saving uploads
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+
+def _save_and_process_upload(uploaded_file) -> List[Document]:
+    """
+    Stream an uploaded file to UPLOAD_DIR in fixed-size chunks and split it
+    
+    The file is written and parsed under a temporary name and renamed into
+    place once complete, so a failed upload never leaves a partial file
+    behind and concurrent uploads sharing a name never read each other's file
+    
+    Args:
+        uploaded_file: Streamlit UploadedFile
+        
+    Returns:
+        List of split Document objects
+    """
+    file_path = os.path.join(UPLOAD_DIR, uploaded_file.name)
+    
+    with tempfile.NamedTemporaryFile(
+        dir=UPLOAD_DIR,
+        suffix=os.path.splitext(uploaded_file.name)[1],
+        delete=False
+    ) as f:
+        try:
+            shutil.copyfileobj(uploaded_file, f, UPLOAD_CHUNK_SIZE)
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    
+    try:
+        split_docs = document_processor.process_document(f.name, source_path=file_path)
+    except BaseException:
+        os.remove(f.name)
+        raise
+    
+    os.replace(f.name, file_path)
+    return split_docs
+
+
+@st.cache_resource(show_spinner=False)
+def _load_chatbot():
+    """Chatbot shared by all sessions"""
+    return get_chatbot()
+
+
+@st.cache_resource(show_spinner=False)
+def _load_vector_store():
+    """Vector store shared by all sessions"""
+    return get_vector_store()
+
+
+@st.cache_resource(show_spinner=False)
+def _load_document_processor():
+    """Document processor shared by all sessions"""
+    return DocumentProcessor()
+
+
+@st.cache_resource(show_spinner=False)
+def _load_llm_loader():
+    """LLM loader shared by all sessions"""
+    return get_llm_loader()
+
+
+@st.cache_resource(show_spinner=False)
+def _warmup():
+    """
+    Warm up the models once per process so the first question is fast
+    
+    Warming the LLM is a billed request, so like the API it is opt-in
+    """
+    try:
+        _load_vector_store().warmup()
+        if os.getenv("WARMUP_LLM", "false").lower() == "true":
+            _load_chatbot().warmup()
+    except Exception as e:
+        print(f"Warning: Warmup failed: {str(e)}")
+
+
+@st.cache_data(ttl=5, show_spinner=False)
+def _collection_count():
+    """
+    Chunk count shared by all sessions, so one session's upload or reset
+    shows up in the others within a few seconds
+    """
+    return _load_vector_store().get_collection_count()
+
+
+# Initialize shared resources; failures aren't cached, so a later rerun retries
+with st.spinner("Initializing RAG system..."):
+    try:
+        preload_embeddings()
+        chatbot = _load_chatbot()
+        vector_store = _load_vector_store()
+        document_processor = _load_document_processor()
+        llm_loader = _load_llm_loader()
+        _warmup()
+        initialized = True
+    except Exception as e:
+        st.error(f"Initialization error: {str(e)}")
+        initialized = False
+
 # Initialize session state
 if 'messages' not in st.session_state:
     st.session_state.messages = []
 
-if 'chatbot' not in st.session_state:
-    with st.spinner("Initializing RAG system..."):
-        try:
-            st.session_state.chatbot = get_chatbot()
-            st.session_state.vector_store = get_vector_store()
-            st.session_state.document_processor = DocumentProcessor()
-            st.session_state.llm_loader = get_llm_loader()
-            st.session_state.initialized = True
-        except Exception as e:
-            st.error(f"Initialization error: {str(e)}")
-            st.session_state.initialized = False
+doc_count = _collection_count() if initialized else 0
 
 # Sidebar
 with st.sidebar:
@@ -91,25 +190,33 @@ with st.sidebar:
             with st.spinner("Processing documents..."):
                 try:
                     processed_count = 0
-                    total_chunks = 0
+                    results = [None] * len(uploaded_files)
+                    progress = st.progress(0.0, text="Processing documents...")
                     
-                    for uploaded_file in uploaded_files:
-                        # Save file
-                        file_path = os.path.join(UPLOAD_DIR, uploaded_file.name)
-                        with open(file_path, "wb") as f:
-                            f.write(uploaded_file.getbuffer())
-                        
-                        # Process document
-                        split_docs = st.session_state.document_processor.process_document(file_path)
+                    # Save and split files concurrently; progress is updated from
+                    # this thread as each file finishes
+                    with ThreadPoolExecutor(max_workers=min(8, len(uploaded_files))) as executor:
+                        futures = {
+                            executor.submit(_save_and_process_upload, uploaded_file): i
+                            for i, uploaded_file in enumerate(uploaded_files)
+                        }
                         
-                        # Add to vector store
-                        st.session_state.vector_store.add_documents(split_docs)
-                        
-                        processed_count += 1
-                        total_chunks += len(split_docs)
+                        for future in as_completed(futures):
+                            results[futures[future]] = future.result()
+                            processed_count += 1
+                            progress.progress(
+                                processed_count / len(uploaded_files),
+                                text=f"Processed {processed_count}/{len(uploaded_files)} files"
+                            )
+                    
+                    all_docs = [doc for split_docs in results for doc in split_docs]
+                    total_chunks = len(all_docs)
                     
-                    # Reinitialize chatbot
-                    st.session_state.chatbot.reinitialize_chain()
+                    # Add all chunks to the vector store in a single batch
+                    vector_store.add_documents(all_docs)
+                    vector_store.flush()
+                    _collection_count.clear()
+                    doc_count = _collection_count()
                     
                     st.success(f"✅ Processed {processed_count} file(s) into {total_chunks} chunks")
                     
@@ -122,13 +229,12 @@ with st.sidebar:
     st.markdown("### ⚙️ System Status")
     
     try:
-        doc_count = st.session_state.vector_store.get_collection_count()
         st.metric("Documents Indexed", doc_count)
         
-        current_llm = st.session_state.llm_loader.config.get('managerLLM')
+        current_llm = llm_loader.config.get('managerLLM')
         st.info(f"🤖 LLM: {current_llm}")
         
-        supported_formats = st.session_state.document_processor.get_supported_extensions()
+        supported_formats = document_processor.get_supported_extensions()
         st.caption(f"📄 Formats: {', '.join(supported_formats[:4])}...")
         
     except Exception as e:
@@ -144,13 +250,14 @@ with st.sidebar:
     with col1:
         if st.button("🗑️ Clear Chat", use_container_width=True):
             st.session_state.messages = []
-            st.session_state.chatbot.clear_memory()
+            chatbot.clear_memory()
             st.rerun()
     
     with col2:
         if st.button("🔄 Reset DB", use_container_width=True):
             try:
-                st.session_state.vector_store.delete_collection()
+                vector_store.delete_collection()
+                _collection_count.clear()
                 if os.path.exists(UPLOAD_DIR):
                     shutil.rmtree(UPLOAD_DIR)
                     os.makedirs(UPLOAD_DIR)
@@ -167,12 +274,11 @@ with st.sidebar:
 # Main content
 st.markdown('<div class="main-header">🤖 RAG Chatbot</div>', unsafe_allow_html=True)
 
-if not st.session_state.initialized:
+if not initialized:
     st.error("⚠️ System not initialized. Please check your configuration.")
     st.stop()
 
 # Check if documents are uploaded
-doc_count = st.session_state.vector_store.get_collection_count()
 if doc_count == 0:
     st.info("👈 Upload documents using the sidebar to get started!")
 
@@ -211,33 +317,33 @@ if prompt := st.chat_input("Ask a question about your documents..."):
         with st.chat_message("assistant", avatar="🤖"):
             with st.spinner("Thinking..."):
                 try:
-                    response = st.session_state.chatbot.chat(prompt)
-                    answer = response["answer"]
-                    sources = response.get("source_documents", [])
+                    response = {}
                     
-                    # Display answer
-                    st.markdown(answer)
+                    def token_stream():
+                        """Yield answer tokens and keep the final response for the sources"""
+                        for chunk in chatbot.stream_chat(prompt):
+                            if "token" in chunk:
+                                yield chunk["token"]
+                            else:
+                                response.update(chunk)
+                    
+                    # Display answer as it is generated
+                    st.write_stream(token_stream())
+                    answer = response.get("answer", "")
+                    sources = response.get("sources", [])
                     
                     # Display sources
                     if sources:
                         with st.expander("📚 Sources", expanded=False):
-                            for i, doc in enumerate(sources, 1):
-                                st.markdown(f"**Source {i}:** {doc.metadata.get('source', 'Unknown')}")
-                                st.caption(doc.page_content[:150] + "...")
-                    
-                    # Format sources for storage
-                    formatted_sources = []
-                    for doc in sources:
-                        formatted_sources.append({
-                            "content": doc.page_content[:200],
-                            "metadata": doc.metadata
-                        })
+                            for i, source in enumerate(sources, 1):
+                                st.markdown(f"**Source {i}:** {source['metadata'].get('source', 'Unknown')}")
+                                st.caption(source['content'][:150] + "...")
                     
-                    # Add assistant message
+                    # Add assistant message; sources are already truncated previews
                     st.session_state.messages.append({
                         "role": "assistant",
                         "content": answer,
-                        "sources": formatted_sources
+                        "sources": sources
                     })
                     
                 except Exception as e:
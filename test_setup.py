@@ -2,6 +2,7 @@
 Quick test script to verify the RAG system setup
 """
 import os
+import time
 from pathlib import Path
 
 
@@ -118,6 +119,28 @@ def test_vector_store():
         return False
 
 
+def test_warmup():
+    """Warm up the embedding model and LLM, timing each"""
+    print("\nWarming up models...")
+    
+    try:
+        from vector_store import get_vector_store
+        from rag_chain import get_chatbot
+        
+        start = time.perf_counter()
+        get_vector_store().warmup()
+        print(f"✓ Embedding model warmed up ({time.perf_counter() - start:.2f}s)")
+        
+        start = time.perf_counter()
+        get_chatbot().warmup()
+        print(f"✓ LLM responded ({time.perf_counter() - start:.2f}s)")
+        
+        return True
+    except Exception as e:
+        print(f"✗ Warmup error: {str(e)}")
+        return False
+
+
 def print_next_steps():
     """Print next steps for the user"""
     print("\n" + "=" * 60)
@@ -153,6 +176,7 @@ def main():
     results.append(("LLM Loader", test_llm_loader()))
     results.append(("Document Processor", test_document_processor()))
     results.append(("Vector Store", test_vector_store()))
+    results.append(("Warmup", test_warmup()))
     
     # Summary
     print("\n" + "=" * 60)
@@ -2,16 +2,704 @@
 Vector Store Manager
 Manages document embeddings and similarity search using ChromaDB
 """
+import hashlib
+import json
 import os
-from typing import List, Optional
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+import chromadb
+import numpy as np
+import torch
 from dotenv import load_dotenv
 
 from langchain.schema import Document
 from langchain_community.vectorstores import Chroma
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.pydantic_v1 import Field, PrivateAttr
+from langchain_core.retrievers import BaseRetriever
 from langchain_huggingface import HuggingFaceEmbeddings
 
+from semantic_cache import SemanticCache
+
+try:
+    import faiss
+except ImportError:  # Optional GPU ANN backend
+    faiss = None
+
 load_dotenv()
 
+# Symmetric int8 scale for unit-norm embedding components
+INT8_SCALE = 127
+
+# Rows of an int8 index widened to float32 at a time when searching without FAISS
+DEQUANTIZE_BLOCK_ROWS = 4096
+
+QUANTIZATION_MODES = ("none", "fp16", "int8")
+
+# FAISS scalar quantizer used for each quantization mode
+FAISS_QUANTIZER_TYPES = {"fp16": "QT_fp16", "int8": "QT_8bit"}
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Only chromadb < 0.4 needs explicit persist() calls
+CHROMA_NEEDS_PERSIST = tuple(int(part) for part in chromadb.__version__.split(".")[:2]) < (0, 4)
+
+
+def _detect_embedding_device() -> str:
+    """
+    Pick the device for the embedding model
+    
+    Returns:
+        EMBEDDING_DEVICE if set, otherwise "cuda", "mps" or "cpu" by availability
+    """
+    device = os.getenv("EMBEDDING_DEVICE")
+    if device:
+        return device
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def _default_embedding_batch_size(device: str) -> int:
+    """
+    Pick the number of chunks per embedding forward pass
+    
+    Args:
+        device: Device the embedding model runs on
+        
+    Returns:
+        EMBEDDING_BATCH_SIZE if set, otherwise 64 on GPU and 32 on CPU
+    """
+    return int(os.getenv("EMBEDDING_BATCH_SIZE", "32" if device == "cpu" else "64"))
+
+
+class _EmbeddingStore:
+    """Thread-safe SQLite table of embedding vectors keyed by content hash"""
+    
+    # Keys per SELECT, under SQLite's bound-parameter limit
+    LOOKUP_BATCH_SIZE = 500
+    
+    def __init__(self, path: str, max_entries: int = 100000):
+        """
+        Initialize the Embedding Store
+        
+        Args:
+            path: SQLite database file, created if missing
+            max_entries: Most vectors kept; the least recently used are evicted first
+        """
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")}
+        if "last_used" not in columns:
+            self._conn.execute(
+                "ALTER TABLE embeddings ADD COLUMN last_used INTEGER NOT NULL DEFAULT 0"
+            )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        
+        # Tracked in memory so inserts don't scan the table; recounted only
+        # when eviction looks due, since other processes may share the file
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+    
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up stored vectors, marking the ones found as recently used
+        
+        Args:
+            keys: Content hashes
+            
+        Returns:
+            Dictionary of the keys found to float32 vectors
+        """
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), self.LOOKUP_BATCH_SIZE):
+                batch = keys[start:start + self.LOOKUP_BATCH_SIZE]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                )
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32)
+            
+            if found:
+                now = time.time_ns()
+                hits = list(found)
+                for start in range(0, len(hits), self.LOOKUP_BATCH_SIZE):
+                    batch = hits[start:start + self.LOOKUP_BATCH_SIZE]
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({','.join('?' * len(batch))})",
+                        [now, *batch]
+                    )
+                self._conn.commit()
+        return found
+    
+    def put_many(self, vectors: Dict[str, np.ndarray]):
+        """
+        Store vectors, evicting the least recently used beyond max_entries
+        
+        Args:
+            vectors: Dictionary of content hash to vector
+        """
+        now = time.time_ns()
+        with self._lock:
+            # Keys are content hashes, so a key already present holds the same vector
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [
+                    (key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                    for key, vector in vectors.items()
+                ]
+            ).rowcount
+            self._count += max(inserted, 0)
+            
+            if self._count > self.max_entries:
+                (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+                if self._count > self.max_entries:
+                    self._count -= self._conn.execute(
+                        "DELETE FROM embeddings WHERE rowid IN "
+                        "(SELECT rowid FROM embeddings ORDER BY last_used, rowid LIMIT ?)",
+                        (self._count - self.max_entries,)
+                    ).rowcount
+            self._conn.commit()
+
+
+class CachedEmbeddings(HuggingFaceEmbeddings):
+    """HuggingFaceEmbeddings that keeps document vectors on disk, keyed by content hash"""
+    
+    cache_path: str = "./emb_cache/embeddings.sqlite"
+    """SQLite file holding cached document vectors"""
+    
+    cache_max_entries: int = 100000
+    """Most document vectors kept on disk; the least recently used are evicted first"""
+    
+    _store: Any = PrivateAttr(default=None)
+    
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._store = _EmbeddingStore(self.cache_path, self.cache_max_entries)
+    
+    def _content_key(self, text: str) -> str:
+        """Hash a text together with the model name, since vectors differ per model"""
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed documents, running the model only on texts not embedded before
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            One embedding per text, in input order
+        """
+        keys = [self._content_key(text) for text in texts]
+        vectors = self._store.get_many(list(set(keys)))
+        
+        # Embed each missing text once, even if it repeats within the batch
+        misses = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if misses:
+            embedded = dict(zip(misses, super().embed_documents(list(misses.values()))))
+            self._store.put_many(embedded)
+            vectors.update(embedded)
+        
+        return [np.asarray(vectors[key], dtype=np.float32).tolist() for key in keys]
+    
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a query without storing it; queries rarely repeat verbatim
+        
+        Args:
+            text: Query text
+            
+        Returns:
+            Query embedding
+        """
+        return self.embed_queries([text])[0]
+    
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several queries in one batch without storing them
+        
+        Args:
+            texts: Query texts
+            
+        Returns:
+            One embedding per query, in input order
+        """
+        return super().embed_documents(texts)
+
+
+# Embedding models shared across the process, keyed by (model, device, batch size)
+_embeddings_instances: Dict[tuple, HuggingFaceEmbeddings] = {}
+_embeddings_lock = threading.Lock()
+
+
+def _get_embeddings(model_name: str, device: str, batch_size: int) -> HuggingFaceEmbeddings:
+    """
+    Get the shared embedding model for a configuration, loading it on first use
+    
+    Args:
+        model_name: HuggingFace embedding model name
+        device: Device to run the model on
+        batch_size: Chunks per embedding forward pass
+        
+    Returns:
+        HuggingFaceEmbeddings instance
+    """
+    key = (model_name, device, batch_size)
+    embeddings = _embeddings_instances.get(key)
+    if embeddings is None:
+        with _embeddings_lock:
+            embeddings = _embeddings_instances.get(key)
+            if embeddings is None:
+                print(f"Loading embedding model: {model_name} ({device})")
+                options = dict(
+                    model_name=model_name,
+                    model_kwargs={'device': device},
+                    encode_kwargs={
+                        'normalize_embeddings': True,
+                        'batch_size': batch_size
+                    },
+                    show_progress=False
+                )
+                
+                # Re-ingesting the same chunks reuses their stored vectors
+                cache_dir = os.getenv("EMBEDDING_CACHE_DIR", "./emb_cache")
+                if cache_dir:
+                    embeddings = CachedEmbeddings(
+                        cache_path=os.path.join(cache_dir, "embeddings.sqlite"),
+                        cache_max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000")),
+                        **options
+                    )
+                else:
+                    embeddings = HuggingFaceEmbeddings(**options)
+                
+                # Half precision on GPU; embeddings are normalized, so the precision loss is negligible
+                if device != "cpu":
+                    embeddings.client.half()
+                
+                _embeddings_instances[key] = embeddings
+    return embeddings
+
+
+def _preload_embeddings():
+    """Load the default embedding model"""
+    try:
+        device = _detect_embedding_device()
+        _get_embeddings(DEFAULT_EMBEDDING_MODEL, device, _default_embedding_batch_size(device))
+    except Exception as e:
+        print(f"Warning: Could not preload embedding model: {str(e)}")
+
+
+_preload_started = False
+_preload_lock = threading.Lock()
+
+
+def preload_embeddings():
+    """
+    Start loading the default embedding model in a background thread
+    
+    Called by the API and Streamlit entry points so the model is usually ready
+    before the first request; importing this module alone loads nothing.
+    Runs at most once per process and is skipped if EMBEDDING_PRELOAD is false.
+    """
+    global _preload_started
+    if os.getenv("EMBEDDING_PRELOAD", "true").lower() != "true":
+        return
+    
+    with _preload_lock:
+        if _preload_started:
+            return
+        _preload_started = True
+    threading.Thread(target=_preload_embeddings, daemon=True).start()
+
+
+class DenseIndex:
+    """In-memory matrix of normalized chunk embeddings for exact top-k search"""
+    
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        documents: List[Document],
+        space: str = "l2",
+        quantization: str = "none"
+    ):
+        """
+        Initialize the Dense Index
+        
+        Args:
+            embeddings: Chunk embeddings laid out [N, d], one row per document
+            documents: Documents aligned with the embedding rows
+            space: Chroma distance space ("l2", "cosine" or "ip") to report scores in
+            quantization: Storage precision, "none" (float32) or "int8"
+        """
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.documents = documents
+        self.space = space
+        self.quantization = quantization
+        self.embeddings = self._quantize(embeddings / norms)
+    
+    @classmethod
+    def from_collection(cls, collection, quantization: str = "none") -> "DenseIndex":
+        """
+        Build an index from every embedding stored in a Chroma collection
+        
+        Args:
+            collection: Chroma collection
+            quantization: Storage precision, "none", "fp16" or "int8"
+            
+        Returns:
+            DenseIndex instance
+        """
+        data = collection.get(include=["embeddings", "documents", "metadatas"])
+        documents = [
+            Document(page_content=text or "", metadata=metadata or {})
+            for text, metadata in zip(data["documents"], data["metadatas"])
+        ]
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
+        return cls(
+            np.asarray(data["embeddings"], dtype=np.float32),
+            documents,
+            space,
+            quantization
+        )
+    
+    def __len__(self) -> int:
+        return len(self.documents)
+    
+    def search(self, query_embedding: List[float], k: int = 4) -> List[tuple]:
+        """
+        Find the k nearest documents with a single matrix-vector product
+        
+        Args:
+            query_embedding: Query embedding
+            k: Number of documents to return
+            
+        Returns:
+            List of tuples (document, distance), nearest first
+        """
+        return self.batch_search([query_embedding], k)[0]
+    
+    def batch_search(self, query_embeddings: List[List[float]], k: int = 4) -> List[List[tuple]]:
+        """
+        Find the k nearest documents for several queries with one matrix product
+        
+        Args:
+            query_embeddings: Query embeddings
+            k: Number of documents to return per query
+            
+        Returns:
+            One list of tuples (document, distance) per query, nearest first
+        """
+        queries = self._normalize_queries(query_embeddings)
+        
+        scores = self._scores(queries)
+        if k < scores.shape[1]:
+            top = np.argpartition(-scores, k, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(scores.shape[1]), (len(queries), 1))
+        
+        results = []
+        for row, candidates in zip(scores, top):
+            candidates = candidates[np.argsort(-row[candidates])]
+            results.append([
+                (self.documents[i], self._to_distance(row[i])) for i in candidates
+            ])
+        return results
+    
+    def _quantize(self, embeddings: np.ndarray) -> np.ndarray:
+        """
+        Store normalized embeddings at the configured precision
+        
+        Unit vectors have components in [-1, 1], so int8 uses one fixed scale
+        """
+        if self.quantization == "int8":
+            return np.ascontiguousarray(
+                np.clip(np.rint(embeddings * INT8_SCALE), -INT8_SCALE, INT8_SCALE),
+                dtype=np.int8
+            )
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+    
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Compute cosine similarity of every query against every stored row
+        
+        int8 rows are widened to float32 a block at a time, since numpy has no
+        BLAS kernel for int8 matrix products; this saves memory but searches
+        slower than float32
+        """
+        if self.quantization == "none":
+            return queries @ self.embeddings.T
+        
+        scores = np.empty((len(queries), len(self.embeddings)), dtype=np.float32)
+        for start in range(0, len(self.embeddings), DEQUANTIZE_BLOCK_ROWS):
+            block = self.embeddings[start:start + DEQUANTIZE_BLOCK_ROWS].astype(np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        
+        scores /= INT8_SCALE
+        return scores
+    
+    @staticmethod
+    def _normalize_queries(query_embeddings: List[List[float]]) -> np.ndarray:
+        """L2-normalize query embeddings into a float32 [M, d] array"""
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return queries / norms
+    
+    def _to_distance(self, similarity: float) -> float:
+        """
+        Convert cosine similarity to the collection's distance: squared L2
+        between unit vectors is 2 - 2cos, cosine and ip distances are 1 - cos
+        """
+        if self.space == "l2":
+            return float(2.0 - 2.0 * similarity)
+        return float(1.0 - similarity)
+
+
+class _FaissIndex(DenseIndex):
+    """Dense index whose vectors live in a FAISS inner-product index"""
+    
+    def batch_search(self, query_embeddings: List[List[float]], k: int = 4) -> List[List[tuple]]:
+        """
+        Find the k nearest documents for several queries in one FAISS search
+        
+        Args:
+            query_embeddings: Query embeddings
+            k: Number of documents to return per query
+            
+        Returns:
+            One list of tuples (document, distance) per query, nearest first
+        """
+        queries = self._normalize_queries(query_embeddings)
+        scores, ids = self.index.search(queries, min(k, len(self.documents)))
+        
+        return [
+            [
+                (self.documents[i], self._to_distance(score))
+                for score, i in zip(row_scores, row_ids)
+                if i != -1
+            ]
+            for row_scores, row_ids in zip(scores, ids)
+        ]
+
+
+class ScalarQuantizedIndex(_FaissIndex):
+    """Dense index stored with a FAISS scalar quantizer and searched on the codes"""
+    
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        documents: List[Document],
+        space: str = "l2",
+        quantization: str = "int8"
+    ):
+        """
+        Initialize the Scalar Quantized Index
+        
+        Args:
+            embeddings: Chunk embeddings laid out [N, d], one row per document
+            documents: Documents aligned with the embedding rows
+            space: Chroma distance space ("l2", "cosine" or "ip") to report scores in
+            quantization: "fp16" or "int8"
+        """
+        super().__init__(embeddings, documents, space)
+        self.quantization = quantization
+        
+        # FAISS scores queries against the quantized codes directly, so rows
+        # are never widened back to float32
+        self.index = faiss.IndexScalarQuantizer(
+            self.embeddings.shape[1],
+            getattr(faiss.ScalarQuantizer, FAISS_QUANTIZER_TYPES[quantization]),
+            faiss.METRIC_INNER_PRODUCT
+        )
+        self.index.train(self.embeddings)
+        self.index.add(self.embeddings)
+        
+        # Vectors now live in the quantized index
+        self.embeddings = None
+    
+    @staticmethod
+    def is_available() -> bool:
+        """Check whether FAISS is installed"""
+        return faiss is not None
+
+
+class FaissGpuIndex(_FaissIndex):
+    """Dense index searched exactly on the GPU with FAISS"""
+    
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        documents: List[Document],
+        space: str = "l2",
+        quantization: str = "none"
+    ):
+        """
+        Initialize the FAISS GPU Index
+        
+        Args:
+            embeddings: Chunk embeddings laid out [N, d], one row per document
+            documents: Documents aligned with the embedding rows
+            space: Chroma distance space ("l2", "cosine" or "ip") to report scores in
+            quantization: "none" stores float32 on the GPU; "fp16" and "int8"
+                both store fp16, as FAISS has no flat int8 GPU index
+        """
+        super().__init__(embeddings, documents, space)
+        self.quantization = quantization
+        
+        cloner_options = faiss.GpuClonerOptions()
+        cloner_options.useFloat16 = quantization != "none"
+        
+        # Inner product on normalized vectors is cosine similarity
+        self._resources = faiss.StandardGpuResources()
+        self.index = faiss.index_cpu_to_gpu(
+            self._resources,
+            0,
+            faiss.IndexFlatIP(self.embeddings.shape[1]),
+            cloner_options
+        )
+        self.index.add(self.embeddings)
+        
+        # Vectors now live on the GPU
+        self.embeddings = None
+    
+    @staticmethod
+    def is_available() -> bool:
+        """Check whether FAISS with GPU support and a GPU are present"""
+        return (
+            faiss is not None
+            and hasattr(faiss, "StandardGpuResources")
+            and faiss.get_num_gpus() > 0
+        )
+
+
+class _QueryCache:
+    """Thread-safe LRU cache with TTL expiry for search results"""
+    
+    def __init__(self, max_size: int = 2000, ttl_seconds: float = 600, enabled: bool = True):
+        """
+        Initialize the Query Cache
+        
+        Args:
+            max_size: Maximum number of cached queries
+            ttl_seconds: Seconds before a cached result expires
+            enabled: Whether caching is enabled
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        
+        # Bumped on clear() so searches that started before it can't store stale results
+        self.generation = 0
+        
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+    
+    def get(self, key: tuple) -> Optional[Any]:
+        """
+        Get a cached result
+        
+        Args:
+            key: Cache key
+            
+        Returns:
+            Cached result, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key: tuple, value: Any, generation: int):
+        """
+        Cache a result
+        
+        Args:
+            key: Cache key
+            value: Result to cache
+            generation: Value of ``generation`` when the search started
+        """
+        if not self.enabled:
+            return
+        
+        with self._lock:
+            if generation != self.generation:
+                return
+            
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop all cached results"""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache statistics
+        
+        Returns:
+            Dictionary with hits, misses and current size
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries)
+            }
+
+
+class ManagerRetriever(BaseRetriever):
+    """Retriever that searches through a VectorStoreManager and its caches"""
+    
+    manager: Any
+    """VectorStoreManager to search"""
+    
+    search_kwargs: dict = Field(default_factory=dict)
+    """Keyword arguments for similarity_search, e.g. k and filter"""
+    
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.manager.similarity_search(query, **self.search_kwargs)
+
 
 class VectorStoreManager:
     """Manages vector store for document embeddings"""
@@ -20,7 +708,12 @@ class VectorStoreManager:
         self,
         persist_directory: Optional[str] = None,
         collection_name: str = "rag_documents",
-        embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+        embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+        batch_size: int = None,
+        dense_search_max_docs: int = None,
+        cache_config: Optional[dict] = None,
+        backend: Optional[str] = None,
+        quantization: Optional[str] = None
     ):
         """
         Initialize the Vector Store Manager
@@ -29,21 +722,87 @@ class VectorStoreManager:
             persist_directory: Directory to persist the vector store
             collection_name: Name of the collection
             embedding_model: HuggingFace embedding model name
+            batch_size: Chunks per embedding forward pass (default from env,
+                or 64 on GPU and 32 on CPU)
+            dense_search_max_docs: Largest collection searched with the in-memory
+                dense index instead of Chroma (default from env or 20000, 0 disables)
+            cache_config: Search result cache settings; keys max_size (2000),
+                ttl_seconds (600) and enabled (True)
+            backend: "chroma" or "faiss-gpu" for unfiltered searches
+                (default from env or "chroma")
+            quantization: Precision of embeddings held by the search index,
+                "none", "fp16" or "int8" (default from env or "none")
         """
         self.persist_directory = persist_directory or os.getenv(
             "CHROMA_PERSIST_DIRECTORY",
             "./chroma_db"
         )
         self.collection_name = collection_name
+        self.device = _detect_embedding_device()
+        self.batch_size = batch_size or _default_embedding_batch_size(self.device)
+        self.dense_search_max_docs = (
+            dense_search_max_docs if dense_search_max_docs is not None
+            else int(os.getenv("DENSE_SEARCH_MAX_DOCS", "20000"))
+        )
         
-        # Initialize embeddings
-        print(f"Loading embedding model: {embedding_model}")
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=embedding_model,
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
+        # Shared with every manager using the same settings; usually already
+        # loaded by the preload thread started by the app
+        self.embeddings = _get_embeddings(embedding_model, self.device, self.batch_size)
+        
+        # Chroma always stores documents and metadata; "faiss-gpu" searches a
+        # GPU copy of the embeddings instead of the in-memory dense index
+        self.backend = backend or os.getenv("VECTOR_BACKEND", "chroma")
+        if self.backend == "faiss-gpu" and not FaissGpuIndex.is_available():
+            print("FAISS GPU backend unavailable, falling back to chroma")
+            self.backend = "chroma"
+        
+        self.quantization = quantization or os.getenv("EMBEDDING_QUANTIZATION", "none")
+        if self.quantization not in QUANTIZATION_MODES:
+            raise ValueError(
+                f"Unsupported quantization: {self.quantization}. "
+                f"Supported: {', '.join(QUANTIZATION_MODES)}"
+            )
+        if self.quantization == "fp16" and not ScalarQuantizedIndex.is_available():
+            # numpy has no fp16 BLAS kernel, so fp16 without FAISS would only be slower
+            print("fp16 quantization needs FAISS, storing float32 embeddings")
+            self.quantization = "none"
+        
+        # HNSW settings for new collections. Embeddings are normalized, so cosine
+        # space matches their geometry. Existing collections keep the settings
+        # they were created with, since Chroma can't change an index's space.
+        self.collection_metadata = {
+            "hnsw:space": "cosine",
+            "hnsw:M": int(os.getenv("CHROMA_HNSW_M", "32")),
+            "hnsw:construction_ef": int(os.getenv("CHROMA_HNSW_EF_CONSTRUCTION", "200")),
+            "hnsw:search_ef": int(os.getenv("CHROMA_HNSW_EF_SEARCH", "64"))
+        }
+        
+        # Cache of recent search results, cleared whenever the collection changes
+        self._cache = _QueryCache(**{
+            "max_size": 2000,
+            "ttl_seconds": 600,
+            "enabled": True,
+            **(cache_config or {})
+        })
+        
+        # Unfiltered results reused for queries whose embedding nearly matches
+        # an earlier one; entries are (k, results)
+        self._semantic_cache = SemanticCache(
+            embedding_function=self.embeddings.embed_query,
+            threshold=float(os.getenv("SEARCH_SEMANTIC_CACHE_THRESHOLD", "0.97")),
+            capacity=self._cache.max_size
         )
         
+        # In-memory copy of the collection's embeddings, rebuilt after changes
+        self._dense_index: Optional[DenseIndex] = None
+        self._dense_index_stale = True
+        self._dense_index_lock = threading.Lock()
+        
+        # Collection size when the caches were last known valid; other
+        # processes sharing the directory only show up as a changed count
+        self._synced_count: Optional[int] = None
+        self._invalidation_callbacks: List[Callable[[], None]] = []
+        
         # Initialize or load vector store
         self.vectorstore = None
         self._initialize_vectorstore()
@@ -52,20 +811,111 @@ class VectorStoreManager:
         """Initialize or load existing vector store"""
         if os.path.exists(self.persist_directory):
             print(f"Loading existing vector store from {self.persist_directory}")
-            self.vectorstore = Chroma(
-                persist_directory=self.persist_directory,
-                embedding_function=self.embeddings,
-                collection_name=self.collection_name
-            )
+            self.vectorstore = self._open_vectorstore()
         else:
             print(f"Creating new vector store at {self.persist_directory}")
             # Will be created when first documents are added
             self.vectorstore = None
     
+    def _open_vectorstore(self) -> Chroma:
+        """
+        Open the collection, creating it with the HNSW settings if it is missing
+        
+        chromadb's get_or_create_collection overwrites the metadata of an
+        existing collection, which would relabel its distance space without
+        rebuilding its index, so the settings are only passed for a new one
+        
+        Returns:
+            Chroma vector store
+        """
+        client = chromadb.PersistentClient(path=self.persist_directory)
+        exists = self.collection_name in {
+            collection.name for collection in client.list_collections()
+        }
+        return Chroma(
+            client=client,
+            persist_directory=self.persist_directory,
+            embedding_function=self.embeddings,
+            collection_name=self.collection_name,
+            collection_metadata=None if exists else self.collection_metadata
+        )
+    
+    def _get_dense_index(self) -> Optional[DenseIndex]:
+        """
+        Get the dense index, rebuilding it from Chroma if the collection changed
+        
+        Returns:
+            DenseIndex instance, or None if the collection is empty or too large
+            for the in-memory index
+        """
+        with self._dense_index_lock:
+            if self._dense_index_stale:
+                # Cleared before building so an add during the build marks it stale again
+                self._dense_index_stale = False
+                self._dense_index = None
+                count = self.get_collection_count()
+                if self.backend == "faiss-gpu" and count > 0:
+                    self._dense_index = FaissGpuIndex.from_collection(
+                        self.vectorstore._collection,
+                        self.quantization
+                    )
+                elif 0 < count <= self.dense_search_max_docs:
+                    index_class = (
+                        ScalarQuantizedIndex
+                        if self.quantization != "none" and ScalarQuantizedIndex.is_available()
+                        else DenseIndex
+                    )
+                    self._dense_index = index_class.from_collection(
+                        self.vectorstore._collection,
+                        self.quantization
+                    )
+            return self._dense_index
+    
+    def _invalidate_search_caches(self):
+        """Drop cached search results and the dense index after the collection changes"""
+        self._cache.clear()
+        self._semantic_cache.clear()
+        self._dense_index_stale = True
+        self._synced_count = None
+        for callback in self._invalidation_callbacks:
+            callback()
+    
+    def add_invalidation_callback(self, callback: Callable[[], None]):
+        """
+        Register a function to call whenever the collection changes
+        
+        Args:
+            callback: Function taking no arguments, e.g. a response cache's clear()
+        """
+        self._invalidation_callbacks.append(callback)
+    
+    def _sync_with_collection(self):
+        """
+        Invalidate search caches if another process changed the collection
+        
+        Writes through this manager invalidate directly; writes by other API
+        workers, Streamlit or the CLI are only visible as a new count
+        """
+        if self.vectorstore is None:
+            return
+        
+        count = self.get_collection_count()
+        if self._synced_count is not None and count != self._synced_count:
+            print("Collection changed by another process, refreshing search caches")
+            self._invalidate_search_caches()
+        self._synced_count = count
+    
+    def warmup(self):
+        """Run a dummy embedding so model weights are loaded before the first request"""
+        self.embeddings.embed_query("warmup")
+    
     def add_documents(self, documents: List[Document]) -> List[str]:
         """
         Add documents to the vector store
         
+        Pass chunks from many files in one call so they are embedded in
+        batches of ``batch_size`` rather than one small batch per file
+        
         Args:
             documents: List of Document objects to add
             
@@ -77,26 +927,33 @@ class VectorStoreManager:
             return []
         
         if self.vectorstore is None:
-            # Create new vector store with documents
             print(f"Creating vector store with {len(documents)} documents")
-            self.vectorstore = Chroma.from_documents(
-                documents=documents,
-                embedding=self.embeddings,
-                persist_directory=self.persist_directory,
-                collection_name=self.collection_name
-            )
+            self.vectorstore = self._open_vectorstore()
         else:
-            # Add to existing vector store
             print(f"Adding {len(documents)} documents to existing vector store")
-            ids = self.vectorstore.add_documents(documents)
-            return ids
         
-        # Persist the changes
-        if hasattr(self.vectorstore, 'persist'):
-            self.vectorstore.persist()
+        # Each slice is embedded in one encode() call, sliced only to stay
+        # under Chroma's per-request limit
+        max_batch_size = getattr(self.vectorstore._client, "max_batch_size", len(documents))
+        ids = []
+        for start in range(0, len(documents), max_batch_size):
+            ids.extend(
+                self.vectorstore.add_documents(documents[start:start + max_batch_size])
+            )
+        self._invalidate_search_caches()
         
         print(f"✓ Successfully added {len(documents)} documents to vector store")
-        return []
+        return ids
+    
+    def flush(self):
+        """
+        Persist the vector store to disk
+        
+        Call once after a batch of add_documents calls rather than per add.
+        chromadb 0.4+ writes through to disk, so there this is a no-op.
+        """
+        if self.vectorstore is not None and CHROMA_NEEDS_PERSIST:
+            self.vectorstore.persist()
     
     def similarity_search(
         self,
@@ -115,15 +972,9 @@ class VectorStoreManager:
         Returns:
             List of similar documents
         """
-        if self.vectorstore is None:
-            print("Vector store is empty. Please add documents first.")
-            return []
-        
-        return self.vectorstore.similarity_search(
-            query=query,
-            k=k,
-            filter=filter
-        )
+        return [
+            doc for doc, _ in self.similarity_search_with_score(query=query, k=k, filter=filter)
+        ]
     
     def similarity_search_with_score(
         self,
@@ -146,16 +997,164 @@ class VectorStoreManager:
             print("Vector store is empty. Please add documents first.")
             return []
         
-        return self.vectorstore.similarity_search_with_score(
-            query=query,
-            k=k,
-            filter=filter
+        self._sync_with_collection()
+        key = (query, k, json.dumps(filter, sort_keys=True) if filter else None)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return list(cached)
+        
+        generation = self._cache.generation
+        
+        if filter is not None:
+            results = self.vectorstore.similarity_search_with_score(
+                query=query,
+                k=k,
+                filter=filter
+            )
+            self._cache.put(key, tuple(results), generation)
+            return results
+        
+        # Semantic tier: reuse results of a differently worded but near-identical query
+        query_embedding = self._semantic_cache.embed_query(query)
+        if self._cache.enabled:
+            match = self._semantic_cache.lookup(query_embedding)
+            if match is not None and match[0] >= k:
+                results = list(match[1][:k])
+                self._cache.put(key, tuple(results), generation)
+                return results
+        
+        dense_index = self._get_dense_index()
+        if dense_index is not None:
+            results = dense_index.search(query_embedding, k)
+        else:
+            results = self._query_collection([query_embedding.tolist()], k)[0]
+        
+        self._cache.put(key, tuple(results), generation)
+        if self._cache.enabled and generation == self._cache.generation:
+            self._semantic_cache.add(query_embedding, (k, tuple(results)))
+        return results
+    
+    def batch_similarity_search(
+        self,
+        queries: List[str],
+        k: int = 4,
+        filter: Optional[dict] = None
+    ) -> List[List[Document]]:
+        """
+        Search for similar documents for several queries at once
+        
+        Args:
+            queries: Query texts
+            k: Number of documents to return per query
+            filter: Metadata filter dictionary
+            
+        Returns:
+            One list of similar documents per query
+        """
+        return [
+            [doc for doc, _ in results]
+            for results in self.batch_similarity_search_with_score(queries, k=k, filter=filter)
+        ]
+    
+    def batch_similarity_search_with_score(
+        self,
+        queries: List[str],
+        k: int = 4,
+        filter: Optional[dict] = None
+    ) -> List[List[tuple]]:
+        """
+        Search for similar documents with scores for several queries at once
+        
+        Cached queries are answered directly; the rest are embedded in one
+        batch and looked up together
+        
+        Args:
+            queries: Query texts
+            k: Number of documents to return per query
+            filter: Metadata filter dictionary
+            
+        Returns:
+            One list of tuples (document, score) per query
+        """
+        if self.vectorstore is None:
+            print("Vector store is empty. Please add documents first.")
+            return [[] for _ in queries]
+        
+        self._sync_with_collection()
+        filter_key = json.dumps(filter, sort_keys=True) if filter else None
+        keys = [(query, k, filter_key) for query in queries]
+        
+        results: List[Optional[List[tuple]]] = []
+        for key in keys:
+            cached = self._cache.get(key)
+            results.append(list(cached) if cached is not None else None)
+        
+        misses = [i for i, result in enumerate(results) if result is None]
+        if not misses:
+            return results
+        
+        generation = self._cache.generation
+        query_texts = [queries[i] for i in misses]
+        if isinstance(self.embeddings, CachedEmbeddings):
+            query_embeddings = self.embeddings.embed_queries(query_texts)
+        else:
+            query_embeddings = self.embeddings.embed_documents(query_texts)
+        
+        dense_index = self._get_dense_index() if filter is None else None
+        if dense_index is not None:
+            miss_results = dense_index.batch_search(query_embeddings, k)
+        else:
+            miss_results = self._query_collection(query_embeddings, k, filter)
+        
+        for i, result in zip(misses, miss_results):
+            results[i] = result
+            self._cache.put(keys[i], tuple(result), generation)
+        
+        return results
+    
+    def _query_collection(
+        self,
+        query_embeddings: List[List[float]],
+        k: int,
+        filter: Optional[dict] = None
+    ) -> List[List[tuple]]:
+        """
+        Run several embedding lookups against Chroma in a single query
+        
+        Args:
+            query_embeddings: Query embeddings
+            k: Number of documents to return per query
+            filter: Metadata filter dictionary
+            
+        Returns:
+            One list of tuples (document, distance) per query
+        """
+        response = self.vectorstore._collection.query(
+            query_embeddings=query_embeddings,
+            n_results=k,
+            where=filter,
+            include=["documents", "metadatas", "distances"]
         )
+        
+        return [
+            [
+                (Document(page_content=text, metadata=metadata or {}), distance)
+                for text, metadata, distance in zip(texts, metadatas, distances)
+            ]
+            for texts, metadatas, distances in zip(
+                response["documents"],
+                response["metadatas"],
+                response["distances"]
+            )
+        ]
     
     def get_retriever(self, search_kwargs: Optional[dict] = None):
         """
         Get a retriever interface for the vector store
         
+        Searches go through similarity_search, so retrieval for chat uses the
+        result caches and the in-memory or GPU index as well
+        
         Args:
             search_kwargs: Arguments for retriever (e.g., {'k': 4})
             
@@ -166,13 +1165,14 @@ class VectorStoreManager:
             raise ValueError("Vector store is empty. Please add documents first.")
         
         search_kwargs = search_kwargs or {"k": 4}
-        return self.vectorstore.as_retriever(search_kwargs=search_kwargs)
+        return ManagerRetriever(manager=self, search_kwargs=search_kwargs)
     
     def delete_collection(self):
         """Delete the entire collection"""
         if self.vectorstore is not None:
             self.vectorstore.delete_collection()
             self.vectorstore = None
+            self._invalidate_search_caches()
             print(f"✓ Deleted collection: {self.collection_name}")
     
     def get_collection_count(self) -> int:
@@ -211,6 +1211,7 @@ class VectorStoreManager:
 
 # Global instance for easy access
 _vector_store: Optional[VectorStoreManager] = None
+_vector_store_lock = threading.Lock()
 
 
 def get_vector_store() -> VectorStoreManager:
@@ -222,5 +1223,7 @@ def get_vector_store() -> VectorStoreManager:
     """
     global _vector_store
     if _vector_store is None:
-        _vector_store = VectorStoreManager()
+        with _vector_store_lock:
+            if _vector_store is None:
+                _vector_store = VectorStoreManager()
     return _vector_store